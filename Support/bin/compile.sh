@@ -2,13 +2,27 @@
 set -e
 
 SCRIPT_DIR="$(cd "$(dirname "$0")" && pwd)"
-SWIFT_FILE="$SCRIPT_DIR/pick-template-browser.swift"
-OUTPUT_BIN="$SCRIPT_DIR/pick-template-browser"
+PICKERS="pick-template-browser pick-template-panel pick-root"
+TARGETS="arm64-apple-macos11 x86_64-apple-macos11"
 
-if [ ! -f "$SWIFT_FILE" ]; then
-    echo "Error: $SWIFT_FILE not found."
-    exit 1
-fi
+BUILD_DIR="$(mktemp -d)"
+trap 'rm -rf "$BUILD_DIR"' EXIT
 
-swiftc -O -gnone "$SWIFT_FILE" -o "$OUTPUT_BIN"
-echo "Compiled $SWIFT_FILE to $OUTPUT_BIN"
\ No newline at end of file
+for PICKER in $PICKERS; do
+    SWIFT_FILE="$SCRIPT_DIR/$PICKER.swift"
+    OUTPUT_BIN="$SCRIPT_DIR/$PICKER"
+
+    if [ ! -f "$SWIFT_FILE" ]; then
+        echo "Error: $SWIFT_FILE not found."
+        exit 1
+    fi
+
+    # Build a universal binary, so the bundle runs on both Apple silicon and Intel Macs
+    SLICES=""
+    for TARGET in $TARGETS; do
+        swiftc -O -gnone -target "$TARGET" "$SWIFT_FILE" -o "$BUILD_DIR/$PICKER-$TARGET"
+        SLICES="$SLICES $BUILD_DIR/$PICKER-$TARGET"
+    done
+    lipo -create $SLICES -output "$OUTPUT_BIN"
+    echo "Compiled $SWIFT_FILE to $OUTPUT_BIN"
+done
@@ -0,0 +1,317 @@
+"""
+MailMate TextTemplate Insertion
+
+This module inserts the contents of a selected template file into a target file at a specified line. The template root directory is persistently stored in ~/.texttemplate_config and can be changed by the user. If not set, the user is prompted to select a directory using a GUI dialog. It is used by ttinsert.py when the daemon isn't running, and by ttinsertd.py.
+"""
+import functools
+import mmap
+import os
+import re
+import shutil
+import socket
+import subprocess
+import tempfile
+import time
+import pickers
+import templates_root
+
+PICKER_PROG = "pick-template-browser"
+# PICKER_PROG = "pick-template-panel"
+# Version of the --server protocol; must match protocolVersion in the .swift pickers
+PICKER_PROTOCOL_VERSION = 1
+# The picker is kept running between insertions and listens on this socket. The name
+# includes the picker and protocol version, so an old server left running is never used.
+PICKER_SOCKET = os.path.join(tempfile.gettempdir(), 'tt-%s-v%d.sock' % (PICKER_PROG, PICKER_PROTOCOL_VERSION))
+# How long to wait for a freshly launched picker (an uncompiled .swift script is slow to start)
+PICKER_STARTUP_TIMEOUT = 15.0
+# How long a picker server may take to answer the version handshake
+PICKER_HELLO_TIMEOUT = 1.0
+# Buffer for writing the spliced file, so a typical draft goes out in a single write
+_WRITE_BUFFER_SIZE = 1 << 20
+
+def find_line_offset(buf, idx):
+    """
+    Find where a line starts, without splitting the contents into lines.
+    Args:
+        buf (mmap.mmap or bytes): File contents.
+        idx (int): Line index (0-based).
+    Returns:
+        int or None: Byte offset of the start of the line, or None if there is no such line.
+    """
+    offset = 0
+    for _ in range(idx):
+        newline = buf.find(b'\n', offset)
+        if newline < 0:
+            return None
+        offset = newline + 1
+    return offset if offset < len(buf) else None
+
+def insert_text_at_line(filepath, line_number, text):
+    """
+    Insert the given text at the specified line number in the file.
+    Args:
+        filepath (str): Path to the file to modify.
+        line_number (int or str): Line number (1-based) to insert at.
+        text (str): Text to insert.
+    """
+    insert_bytes_at_line(filepath, line_number, text.encode('utf-8'))
+
+def insert_bytes_at_line(filepath, line_number, data):
+    """
+    Insert the given bytes at the specified line number in the file.
+    Args:
+        filepath (str): Path to the file to modify.
+        line_number (int or str): Line number (1-based) to insert at.
+        data (bytes): UTF-8 encoded text to insert.
+    Inserting past the last line just appends to the file. Otherwise the file
+    is mapped into memory and written, with the data spliced in, to a
+    temporary file alongside it, which then atomically replaces the original.
+    """
+    idx = max(0, int(line_number) - 1)
+    # Unbuffered, as the file is only ever read through the mmap
+    with open(filepath, 'rb', buffering=0) as f:
+        # mmap can't map an empty file, and it has no lines anyway
+        if os.fstat(f.fileno()).st_size > 0:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                offset = find_line_offset(mm, idx)
+                if offset is not None:
+                    _write_spliced(filepath, mm, offset, data)
+                    return
+    with open(filepath, 'ab', buffering=0) as f:
+        f.write(data)
+
+def _write_spliced(filepath, contents, offset, data):
+    """
+    Replace the file with contents[:offset] + data + contents[offset:].
+    The new contents go to a temporary file in the same directory, which is
+    renamed over the original, so a failure part way through leaves the
+    original untouched.
+    """
+    dirname, basename = os.path.split(filepath)
+    dst = tempfile.NamedTemporaryFile('wb', buffering=_WRITE_BUFFER_SIZE, delete=False, dir=dirname, prefix='.' + basename + '.', suffix='.tt.tmp')
+    try:
+        with dst, memoryview(contents) as view:
+            dst.write(view[:offset])
+            dst.write(data)
+            dst.write(view[offset:])
+        shutil.copymode(filepath, dst.name)
+        os.replace(dst.name, filepath)
+    except BaseException:
+        # Don't leave the temporary file behind next to the user's draft
+        try:
+            os.unlink(dst.name)
+        except FileNotFoundError:
+            pass
+        raise
+
+@functools.lru_cache(maxsize=1)
+def _picker():
+    """
+    Returns the picker executable. It is resolved on first use rather than at
+    import, since that may mean compiling it, and then reused for the rest of the run.
+    """
+    return pickers.resolve_picker(PICKER_PROG)
+
+class PickerHandshakeError(Exception):
+    """A server is listening on the picker socket, but doesn't speak our protocol version."""
+
+def _connect_to_picker():
+    """
+    Connects to the picker server and checks it speaks our protocol version.
+    Returns:
+        socket.socket: Connected socket.
+    Raises:
+        OSError: If no server is listening.
+        PickerHandshakeError: If the server answers with another version, or not at all.
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(PICKER_SOCKET)
+        hello = b'HELLO %d\n' % PICKER_PROTOCOL_VERSION
+        reply = b''
+        try:
+            sock.settimeout(PICKER_HELLO_TIMEOUT)
+            sock.sendall(hello)
+            while not reply.endswith(b'\n') and len(reply) < 64:
+                chunk = sock.recv(64)
+                if not chunk:
+                    break
+                reply += chunk
+        except OSError as e:
+            raise PickerHandshakeError(str(e))
+        if reply != hello:
+            raise PickerHandshakeError(reply.decode('utf-8', 'replace').strip())
+        sock.settimeout(None)
+    except BaseException:
+        sock.close()
+        raise
+    return sock
+
+def connect_picker(picker_path):
+    """
+    Connects to the running picker server, launching it first if needed.
+    Args:
+        picker_path (str): Picker executable, which must support --server.
+    Returns:
+        socket.socket or None: Connected socket, or None if no usable server could be reached.
+    """
+    try:
+        return _connect_to_picker()
+    except PickerHandshakeError:
+        return None
+    except OSError:
+        pass
+    # No server yet (or a stale socket); start one detached so it outlives this script
+    server = subprocess.Popen([picker_path, '--server', PICKER_SOCKET],
+                              stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                              start_new_session=True)
+    deadline = time.monotonic() + PICKER_STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        try:
+            return _connect_to_picker()
+        except PickerHandshakeError:
+            break
+        except OSError:
+            if server.poll() is not None:
+                break
+    # It never came up as a server (e.g. a picker without --server support, which would
+    # show a window nobody reads), so make sure it's gone before falling back
+    if server.poll() is None:
+        server.kill()
+    return None
+
+def get_template(template_root):
+    """
+    Prompts the user to select a template file from the template root directory.
+    Returns the path of the selected file, or None if cancelled.
+    Args:
+        template_root (str): Directory to search for templates.
+    Returns:
+        str or None: Path of the selected template file, or None.
+    """
+    script_path = _picker()
+    try:
+        sock = connect_picker(script_path)
+        if sock is not None:
+            # The server replies with the selected path, or an empty line if the user cancelled
+            with sock, sock.makefile('rw', encoding='utf-8') as f:
+                f.write('SELECT\t' + template_root + '\n')
+                f.flush()
+                selected_file = f.readline().strip()
+        else:
+            result = subprocess.run([script_path, template_root], capture_output=True, text=True)
+            # A non-zero exit means the user cancelled or an error occurred
+            selected_file = result.stdout.strip() if result.returncode == 0 else ''
+        if selected_file and os.path.isfile(selected_file):
+            return selected_file
+    except Exception as e:
+        pass    
+    return None
+
+# Currently we only support [[TO=firstname]] and [[TO=fullname]]
+_TAG_RE = re.compile(r'\[\[TO=(firstname|fullname)\]\]')
+
+def tag_values(env):
+    """
+    Returns the replacement for each tag.
+    Args:
+        env (dict): Environment MailMate set for the command.
+    """
+    return {'firstname': env.get('MM_TO_NAME_FIRST', ''), 'fullname': env.get('MM_TO_NAME', '')}
+
+# MailMate sets these once per invocation, so read them once at import
+_TAG_VALUES = tag_values(os.environ)
+
+def replace_tags(text, values=_TAG_VALUES):
+    """
+    Replace QuickText-style tags, in a single pass over the text.
+    Args:
+        text (str): Template text.
+        values (dict): Replacement for each tag; defaults to this invocation's environment.
+    """
+    return _TAG_RE.sub(lambda m: values[m.group(1)], text)
+
+def insert_file_at_line(filepath, line_number, template_path, values=_TAG_VALUES):
+    """
+    Insert the contents of a template file, with its tags replaced, at the
+    specified line number in the file.
+    Args:
+        filepath (str): Path to the file to modify.
+        line_number (int or str): Line number (1-based) to insert at.
+        template_path (str): Path to the template file.
+        values (dict): Replacement for each tag; defaults to this invocation's environment.
+    """
+    mtime = os.stat(template_path).st_mtime_ns
+    data = _render(template_path, mtime, tuple(sorted(values.items())))
+    insert_bytes_at_line(filepath, line_number, data)
+
+@functools.lru_cache(maxsize=32)
+def _render(template_path, mtime, values):
+    """
+    Returns the template's contents, with its tags replaced, as bytes.
+    The same template is often inserted again (in the daemon), so results are
+    cached; mtime is part of the key so that editing the template invalidates it.
+    Args:
+        template_path (str): Path to the template file.
+        mtime (int): Modification time of the template, in nanoseconds.
+        values (tuple): (tag, replacement) pairs.
+    """
+    with open(template_path, 'rb', buffering=0) as tf:
+        data = tf.read()
+    # Templates without tags are copied as they are, without decoding them
+    if b'[[' in data:
+        data = replace_tags(data.decode('utf-8'), dict(values)).encode('utf-8')
+    return data
+
+def show_error(message):
+    """
+    Show the user an error dialog, in a GUI.
+    osascript is left running on its own, so the caller can exit straight away.
+    Args:
+        message (str): Message to display.
+    """
+    script = 'display dialog "' + message + '" with title "TextTemplate Error" buttons {"OK"} default button "OK" '
+    subprocess.Popen(["osascript", "-e", script],
+                     stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                     close_fds=True)
+
+def in_composer(env=os.environ):
+    """
+    Check if the script is running in a MailMate composer window.
+    Args:
+        env (dict): Environment MailMate set for the command.
+    """
+    # We don't have a great way of checking at the moment, but we will...
+    return not env.get('MM_HEADER_RECEIVED')
+
+def main(line_number, filepath, env=os.environ):
+    """
+    Let the user pick a template and insert it into the message being edited.
+    Args:
+        line_number (int): Line number (1-based) to insert at.
+        filepath (str): Path to the file being edited.
+        env (dict): Environment MailMate set for the command, for the composer check and tags.
+    Returns:
+        int: Exit status for the command.
+    """
+    # with open(os.path.join(os.getcwd(), "ttinsert.log"), "a") as log_file:
+    #     log_file.write("Header received " + str(env.get('MM_HEADER_RECEIVED')) + "\n")
+
+    if not in_composer(env):
+        show_error("TextTemplate can only be run from a composer window.")
+        return 1
+
+    root = templates_root.get_templates_root()
+    if not root:
+        root = templates_root.prompt_for_templates_root()
+    if root:
+        template_path = get_template(root)
+        if template_path is not None:
+            insert_file_at_line(filepath, line_number, template_path, tag_values(env))
+            # mm_env = {k: v for k, v in env.items() if k.startswith('MM_')}
+            # env_output = '\n'.join(f'{k}={v}' for k, v in mm_env.items())
+            # insert_text_at_line(filepath, line_number, env_output)
+        return 0
+    show_error("Can not get a template root directory.")
+    return 1
@@ -0,0 +1,44 @@
+#!/bin/bash
+# Installs ttinsertd.py as a per-user launchd agent, so template insertions
+# are handled by an already running Python process.
+set -e
+
+SCRIPT_DIR="$(cd "$(dirname "$0")" && pwd)"
+LABEL="texttemplate.ttinsertd"
+PLIST="$HOME/Library/LaunchAgents/$LABEL.plist"
+# Use the same temporary directory MailMate commands see, so ttinsert.py finds the socket
+SOCKET="${TMPDIR:-/tmp}"
+SOCKET="${SOCKET%/}/ttinsertd.sock"
+PYTHON="$(command -v python3)"
+
+if [ -z "$PYTHON" ]; then
+    echo "Error: python3 not found."
+    exit 1
+fi
+
+mkdir -p "$(dirname "$PLIST")"
+cat > "$PLIST" <<PLIST_EOF
+<?xml version="1.0" encoding="UTF-8"?>
+<!DOCTYPE plist PUBLIC "-//Apple//DTD PLIST 1.0//EN" "http://www.apple.com/DTDs/PropertyList-1.0.dtd">
+<plist version="1.0">
+<dict>
+	<key>Label</key>
+	<string>$LABEL</string>
+	<key>ProgramArguments</key>
+	<array>
+		<string>$PYTHON</string>
+		<string>$SCRIPT_DIR/ttinsertd.py</string>
+		<string>--socket</string>
+		<string>$SOCKET</string>
+	</array>
+	<key>RunAtLoad</key>
+	<true/>
+	<key>KeepAlive</key>
+	<true/>
+</dict>
+</plist>
+PLIST_EOF
+
+launchctl bootout "gui/$(id -u)/$LABEL" 2>/dev/null || true
+launchctl bootstrap "gui/$(id -u)" "$PLIST"
+echo "Installed $LABEL, listening on $SOCKET"
@@ -230,15 +230,16 @@ final class BrowserDelegate: NSObject, NSBrowserDelegate {
 final class BrowserPickerVC: NSViewController {
     private let browser = NSBrowser()
     private let delegateObj: BrowserDelegate
-    private let onChoose: (URL) -> Void
+    private let onFinish: (URL?) -> Void
     private let chooseButton = NSButton(title: "Choose", target: nil, action: nil)
     private let cancelButton = NSButton(title: "Cancel", target: nil, action: nil)
     private let splitView = NSSplitView()
     private let preview = PreviewPane()
 
-    init(root: URL, filter: FileFilter, lister: DirectoryLister, onChoose: @escaping (URL) -> Void) {
+    /// `onFinish` receives the chosen file, or nil if the user cancelled.
+    init(root: URL, filter: FileFilter, lister: DirectoryLister, onFinish: @escaping (URL?) -> Void) {
         self.delegateObj = BrowserDelegate(root: root, filter: filter, lister: lister)
-        self.onChoose = onChoose
+        self.onFinish = onFinish
         super.init(nibName: nil, bundle: nil)
 
         browser.delegate = delegateObj
@@ -345,21 +346,18 @@ final class BrowserPickerVC: NSViewController {
     @objc private func selectionChanged() { updateSelectionUI() }
 
     @objc private func chooseAction() {
-        if let url = selectedURL(), !url.isDirectoryURL { onChoose(url) }
+        if let url = selectedURL(), !url.isDirectoryURL { onFinish(url) }
     }
 
-    @objc private func cancelAction() {
-        view.window?.close()
-        exitCancel()
-    }
+    @objc private func cancelAction() { onFinish(nil) }
 
     override func keyDown(with event: NSEvent) {
         switch event.keyCode {
         case 36: // Return
-            if let url = selectedURL(), !url.isDirectoryURL { onChoose(url); return }
+            if let url = selectedURL(), !url.isDirectoryURL { onFinish(url); return }
         case 53: // Escape
-            view.window?.close()
-            exitCancel()
+            onFinish(nil)
+            return
         default: break
         }
         super.keyDown(with: event)
@@ -368,30 +366,63 @@ final class BrowserPickerVC: NSViewController {
 
 // MARK: - Window / App plumbing
 final class WindowCloseDelegate: NSObject, NSWindowDelegate {
-    func windowWillClose(_ notification: Notification) { exitCancel() }
+    private let onClose: () -> Void
+    init(onClose: @escaping () -> Void) { self.onClose = onClose }
+    func windowWillClose(_ notification: Notification) { onClose() }
 }
 
 final class AppController {
     private let app = NSApplication.shared
     private var windowControllers: [NSWindowController] = [] // Keep strong refs
     private var windowDelegates: [WindowCloseDelegate] = []  // Keep strong refs (NSWindow keeps weak delegate)
+    private var server: PickerServer?
 
+    /// Shows a single picker and exits with the result.
     func run(rootPath: String) {
         app.setActivationPolicy(.regular)
         app.activate(ignoringOtherApps: true)
 
+        choose(rootPath: rootPath) { url in
+            if let url = url { exitSuccess(with: url) }
+            exitCancel()
+        }
+        app.run()
+    }
+
+    /// Stays running and shows a picker for each request received on `socketPath`.
+    func serve(socketPath: String) {
+        app.setActivationPolicy(.accessory)   // no Dock icon while idle
+        signal(SIGPIPE, SIG_IGN)              // a client that goes away must not kill the server
+        let server = PickerServer(socketPath: socketPath) { [weak self] rootPath, completion in
+            self?.choose(rootPath: rootPath, completion: completion)
+        }
+        guard server.start() else { exit(1) }
+        self.server = server
+        app.run()
+    }
+
+    private func choose(rootPath: String, completion: @escaping (URL?) -> Void) {
+        // Directory listings are not reused between requests, so edits to the templates show up
         let lister = DirectoryLister()
         let filter = FileFilter(allowedExts: ["txt", "md", "text", "mdown", "mkd", "markdown", "mkdn", "mdwn"])
 
         let rootURL = URL(fileURLWithPath: rootPath)
-        let vc = BrowserPickerVC(root: rootURL, filter: filter, lister: lister) { url in
-            exitSuccess(with: url)
+        var window: NSWindow?
+        var finished = false
+        let finish: (URL?) -> Void = { [weak self] url in
+            guard !finished else { return }
+            finished = true
+            window?.close()
+            self?.release(window)
+            // Break window -> VC -> onFinish -> window, so the server doesn't leak a window per request
+            window = nil
+            completion(url)
         }
-        presentController(vc, title: "Choose Template")
-        app.run()
+        let vc = BrowserPickerVC(root: rootURL, filter: filter, lister: lister, onFinish: finish)
+        window = presentController(vc, title: "Choose Template") { finish(nil) }
     }
 
-    private func presentController(_ vc: NSViewController, title: String) {
+    private func presentController(_ vc: NSViewController, title: String, onClose: @escaping () -> Void) -> NSWindow {
         let window = NSWindow(contentViewController: vc)
         window.styleMask = [.titled, .closable, .resizable]
         window.setContentSize(NSSize(width: 900, height: 600))
@@ -399,7 +430,7 @@ final class AppController {
         window.center()
         window.isReleasedWhenClosed = false
 
-        let closeDelegate = WindowCloseDelegate()
+        let closeDelegate = WindowCloseDelegate(onClose: onClose)
         window.delegate = closeDelegate
         windowDelegates.append(closeDelegate) // retain delegate strongly
 
@@ -407,13 +438,124 @@ final class AppController {
         windowControllers.append(wc) // retain window controller strongly
         wc.showWindow(nil)
         NSApp.activate(ignoringOtherApps: true)
+        return window
+    }
+
+    private func release(_ window: NSWindow?) {
+        guard let window = window else { return }
+        windowControllers.removeAll { $0.window === window }
+        windowDelegates.removeAll { $0 === window.delegate }
     }
 }
 
-// MARK: - Entry point (script-friendly)
-let rootPath: String = {
-    if CommandLine.arguments.count > 1 { return CommandLine.arguments[1] }
-    return FileManager.default.currentDirectoryPath
-}()
+// MARK: - Server mode
+/// Serves picker requests over a Unix domain socket, so a single warm process
+/// can handle every template insertion in a session.
+/// A client first sends `HELLO <version>` and gets back `HELLO <protocolVersion>`;
+/// the connection is dropped if the versions differ. A request is then one line,
+/// `SELECT\t<root>`; the reply is one line holding the chosen path, or an empty
+/// line if the user cancelled.
+final class PickerServer {
+    typealias Handler = (String, @escaping (URL?) -> Void) -> Void
+
+    /// Must match PICKER_PROTOCOL_VERSION in insertion.py
+    static let protocolVersion = 1
+
+    private let socketPath: String
+    private let handler: Handler
+    /// Only one picker window is shown at a time; other clients wait their turn
+    private let pickerTurn = DispatchSemaphore(value: 1)
+
+    init(socketPath: String, handler: @escaping Handler) {
+        self.socketPath = socketPath
+        self.handler = handler
+    }
+
+    /// Binds the socket and starts accepting requests on a background thread.
+    func start() -> Bool {
+        var addr = sockaddr_un()
+        addr.sun_family = sa_family_t(AF_UNIX)
+        let pathBytes = Array(socketPath.utf8CString)
+        guard pathBytes.count <= MemoryLayout.size(ofValue: addr.sun_path) else { return false }
+        withUnsafeMutableBytes(of: &addr.sun_path) { raw in
+            pathBytes.withUnsafeBytes { raw.copyMemory(from: $0) }
+        }
+
+        let fd = socket(AF_UNIX, SOCK_STREAM, 0)
+        guard fd >= 0 else { return false }
+        unlink(socketPath) // remove a stale socket left by a previous server
+        let bound = withUnsafePointer(to: &addr) {
+            $0.withMemoryRebound(to: sockaddr.self, capacity: 1) {
+                bind(fd, $0, socklen_t(MemoryLayout<sockaddr_un>.size))
+            }
+        }
+        guard bound == 0, listen(fd, 8) == 0 else {
+            close(fd)
+            return false
+        }
+        Thread.detachNewThread { self.acceptLoop(fd) }
+        return true
+    }
+
+    private func acceptLoop(_ fd: Int32) {
+        while true {
+            let client = accept(fd, nil, nil)
+            guard client >= 0 else { continue }
+            // Each client gets its own thread, so the handshake is answered even while a picker is open
+            Thread.detachNewThread { self.serve(client: client) }
+        }
+    }
+
+    private func serve(client: Int32) {
+        defer { close(client) }
+
+        let hello = "HELLO \(PickerServer.protocolVersion)"
+        let greeting = readLine(from: client)
+        writeLine(hello, to: client)
+        guard greeting == hello else { return }
+
+        let prefix = "SELECT\t"
+        let line = readLine(from: client)
+        guard line.hasPrefix(prefix) else { return }
+        let rootPath = String(line.dropFirst(prefix.count))
+
+        pickerTurn.wait()
+        defer { pickerTurn.signal() }
+        var chosen: URL?
+        let done = DispatchSemaphore(value: 0)
+        DispatchQueue.main.async {
+            self.handler(rootPath) { url in
+                chosen = url
+                done.signal()
+            }
+        }
+        done.wait()
+        writeLine(chosen?.path ?? "", to: client)
+    }
+
+    private func writeLine(_ line: String, to fd: Int32) {
+        (line + "\n").utf8CString.withUnsafeBufferPointer { buf in
+            _ = write(fd, buf.baseAddress, buf.count - 1) // drop the trailing NUL
+        }
+    }
+
+    private func readLine(from fd: Int32) -> String {
+        var data = [UInt8]()
+        var byte: UInt8 = 0
+        while data.count < 64 * 1024, read(fd, &byte, 1) == 1, byte != UInt8(ascii: "\n") {
+            data.append(byte)
+        }
+        return String(decoding: data, as: UTF8.self)
+    }
+}
 
-AppController().run(rootPath: rootPath)
+// MARK: - Entry point (script-friendly)
+// Usage: pick-template-browser [root]
+//        pick-template-browser --server <socket-path>
+let args = CommandLine.arguments
+if args.count > 2 && args[1] == "--server" {
+    AppController().serve(socketPath: args[2])
+} else {
+    let rootPath = (args.count > 1) ? args[1] : FileManager.default.currentDirectoryPath
+    AppController().run(rootPath: rootPath)
+}
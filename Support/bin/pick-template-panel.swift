@@ -2,16 +2,19 @@
 import AppKit
 import Foundation
 
+// Usage: pick-template-panel [root]
+//        pick-template-panel --server <socket-path>
 // Root directory comes from argv or defaults to CWD
-let rootPath = (CommandLine.arguments.count > 1)
-  ? CommandLine.arguments[1]
-  : FileManager.default.currentDirectoryPath
+let args = CommandLine.arguments
+let serverMode = args.count > 2 && args[1] == "--server"
 
 let app = NSApplication.shared
 app.setActivationPolicy(.accessory)           // don't show a Dock icon
-app.activate(ignoringOtherApps: true)         // bring panel to front
 
-DispatchQueue.main.async {
+// Show the open panel rooted at rootPath; completion gets the chosen file, or nil on cancel
+func choose(rootPath: String, completion: @escaping (URL?) -> Void) {
+  app.activate(ignoringOtherApps: true)       // bring panel to front
+
   let panel = NSOpenPanel()
   panel.directoryURL = URL(fileURLWithPath: rootPath, isDirectory: true)
   panel.canChooseFiles = true
@@ -19,18 +22,110 @@ DispatchQueue.main.async {
   panel.allowsMultipleSelection = false
   panel.title = "Choose a Template"
   panel.prompt = "Insert"
-  panel.allowedFileTypes = ["txt", "md", "text", "mdown", "mkd", "markdown", "mdown", "mkdn", "mdwn"] 
+  panel.allowedFileTypes = ["txt", "md", "text", "mdown", "mkd", "markdown", "mdown", "mkdn", "mdwn"]
   panel.allowsOtherFileTypes = false
   panel.resolvesAliases = true
   panel.showsHiddenFiles = false
 
   panel.begin { resp in
-    if resp == .OK, let url = panel.url {
-      print(url.path)
-      fflush(stdout)
-      exit(0)                                  // return success
-    } else {
-      exit(1)                                  // return non-zero on cancel
+    completion(resp == .OK ? panel.url : nil)
+  }
+}
+
+// Version of the server protocol; must match PICKER_PROTOCOL_VERSION in insertion.py
+let protocolVersion = 1
+
+func readLine(from fd: Int32) -> String {
+  var data = [UInt8]()
+  var byte: UInt8 = 0
+  while data.count < 64 * 1024, read(fd, &byte, 1) == 1, byte != UInt8(ascii: "\n") {
+    data.append(byte)
+  }
+  return String(decoding: data, as: UTF8.self)
+}
+
+func writeLine(_ line: String, to fd: Int32) {
+  (line + "\n").utf8CString.withUnsafeBufferPointer { buf in
+    _ = write(fd, buf.baseAddress, buf.count - 1) // drop the trailing NUL
+  }
+}
+
+// Server mode: one request per connection. The client sends "HELLO <version>" and
+// gets back "HELLO <protocolVersion>", and the connection is dropped if they differ.
+// Then a line "SELECT\t<root>"; the reply is one line holding the chosen path, or an
+// empty line on cancel
+func serve(socketPath: String) -> Bool {
+  var addr = sockaddr_un()
+  addr.sun_family = sa_family_t(AF_UNIX)
+  let pathBytes = Array(socketPath.utf8CString)
+  guard pathBytes.count <= MemoryLayout.size(ofValue: addr.sun_path) else { return false }
+  withUnsafeMutableBytes(of: &addr.sun_path) { raw in
+    pathBytes.withUnsafeBytes { raw.copyMemory(from: $0) }
+  }
+
+  let fd = socket(AF_UNIX, SOCK_STREAM, 0)
+  guard fd >= 0 else { return false }
+  unlink(socketPath)                           // remove a stale socket left by a previous server
+  let bound = withUnsafePointer(to: &addr) {
+    $0.withMemoryRebound(to: sockaddr.self, capacity: 1) {
+      bind(fd, $0, socklen_t(MemoryLayout<sockaddr_un>.size))
+    }
+  }
+  guard bound == 0, listen(fd, 8) == 0 else {
+    close(fd)
+    return false
+  }
+  signal(SIGPIPE, SIG_IGN)                     // a client that goes away must not kill the server
+
+  let pickerTurn = DispatchSemaphore(value: 1) // only one panel is open at a time
+  Thread.detachNewThread {
+    while true {
+      let client = accept(fd, nil, nil)
+      guard client >= 0 else { continue }
+      // Each client gets its own thread, so the handshake is answered even while a panel is open
+      Thread.detachNewThread {
+        defer { close(client) }
+
+        let hello = "HELLO \(protocolVersion)"
+        let greeting = readLine(from: client)
+        writeLine(hello, to: client)
+        guard greeting == hello else { return }
+
+        let prefix = "SELECT\t"
+        let line = readLine(from: client)
+        guard line.hasPrefix(prefix) else { return }
+
+        pickerTurn.wait()
+        defer { pickerTurn.signal() }
+        var chosen: URL?
+        let done = DispatchSemaphore(value: 0)
+        DispatchQueue.main.async {
+          choose(rootPath: String(line.dropFirst(prefix.count))) { url in
+            chosen = url
+            done.signal()
+          }
+        }
+        done.wait()
+        writeLine(chosen?.path ?? "", to: client)
+      }
+    }
+  }
+  return true
+}
+
+if serverMode {
+  guard serve(socketPath: args[2]) else { exit(1) }
+} else {
+  let rootPath = (args.count > 1) ? args[1] : FileManager.default.currentDirectoryPath
+  DispatchQueue.main.async {
+    choose(rootPath: rootPath) { url in
+      if let url = url {
+        print(url.path)
+        fflush(stdout)
+        exit(0)                                // return success
+      } else {
+        exit(1)                                // return non-zero on cancel
+      }
     }
   }
 }
@@ -0,0 +1,84 @@
+"""
+MailMate TextTemplate Picker Lookup
+
+This module finds the executable to run for one of the Swift pickers. A binary compiled by compile.sh is preferred, as long as it is at least as new as its script. Failing that, the .swift script is compiled once into ~/Library/Caches/texttemplate when the picker is first needed, so that later runs don't go through the Swift interpreter. The .swift script itself is only run if it can't be compiled; a failed compile is remembered so it isn't retried until the script changes.
+"""
+import os
+import subprocess
+
+_BIN_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.expanduser('~/Library/Caches/texttemplate')
+
+def _is_executable(path):
+    return os.path.isfile(path) and os.access(path, os.X_OK)
+
+def _is_current(binary_path, script_path):
+    """
+    Returns True if the binary exists and was built from the current script,
+    judging by modification times. A binary left over from before the script was
+    updated may not support what the script does now, e.g. --server.
+    """
+    if not _is_executable(binary_path):
+        return False
+    try:
+        return os.path.getmtime(binary_path) >= os.path.getmtime(script_path)
+    except FileNotFoundError:
+        # Only the binary was shipped
+        return True
+
+def resolve_picker(picker_prog):
+    """
+    Returns the path of the executable to run for a picker, compiling it first if needed.
+    Call this when the picker is about to be used, as compiling can take several seconds.
+    Args:
+        picker_prog (str): Name of the picker, e.g. "pick-template-browser".
+    Returns:
+        str: Path of the compiled picker, or of the .swift script if it couldn't be compiled.
+    """
+    compiled_path = os.path.join(_BIN_DIR, picker_prog)
+    script_path = compiled_path + '.swift'
+    if _is_current(compiled_path, script_path):
+        return compiled_path
+    cached_path = os.path.join(CACHE_DIR, picker_prog)
+    if _is_current(cached_path, script_path) or _compile(script_path, cached_path):
+        return cached_path
+    return script_path
+
+def _compile(script_path, cached_path):
+    """
+    Compiles the script into cached_path, unless compiling this version of it
+    has failed before. Returns True on success.
+    """
+    # Holds the modification time of the script that last failed to compile
+    failed_path = cached_path + '.failed'
+    try:
+        script_mtime = str(os.stat(script_path).st_mtime_ns)
+    except FileNotFoundError:
+        return False
+    try:
+        with open(failed_path) as f:
+            if f.read().strip() == script_mtime:
+                return False
+    except OSError:
+        pass
+
+    tmp_path = '%s.%d.tmp' % (cached_path, os.getpid())
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        # Compile to a private name first, so a concurrent run never sees a half-written binary
+        result = subprocess.run(['swiftc', '-O', '-gnone', script_path, '-o', tmp_path],
+                                stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        if result.returncode == 0:
+            os.replace(tmp_path, cached_path)
+            return True
+    except OSError:
+        # No swiftc, or the cache directory isn't writable
+        pass
+    try:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        with open(failed_path, 'w') as f:
+            f.write(script_mtime + '\n')
+    except OSError:
+        pass
+    return False
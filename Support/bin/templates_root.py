@@ -4,35 +4,65 @@ MailMate TextTemplate Change Root Script
 
 This script allows users to change the template root directory. The template root directory is persistently stored in ~/.texttemplate_config.
 """
+import functools
 import os
 import subprocess
+import pickers
+
+# Environment variable used to hand the resolved root to child processes
+ROOT_ENV_VAR = 'TT_ROOT'
+
+_CONFIG_PATH = os.path.expanduser('~/.texttemplate_config')
+_DEFAULT_ROOT = os.path.expanduser('~/Documents')
+# Upper bound on the config file's size; it only holds one path
+_CONFIG_MAX_SIZE = 4096
 
 def get_config_path():
     """Returns the path to the config file storing the template root directory."""
-    return os.path.expanduser('~/.texttemplate_config')
+    return _CONFIG_PATH
 
+@functools.lru_cache(maxsize=1)
 def get_templates_root():
-    """Gets the templates root directory from the config file."""
-    config_path = get_config_path()
-    if os.path.isfile(config_path):
-        with open(config_path, 'r') as f:
-            path = f.read().strip()
-            if path:
-                return path
+    """
+    Gets the templates root directory from the config file.
+    The result is cached for the rest of the run, and is also exported in
+    $TT_ROOT so that child processes can skip reading the config file.
+    """
+    path = os.environ.get(ROOT_ENV_VAR)
+    if path:
+        return path
+    # The file is tiny, so read it with a single os.read rather than through the io stack
+    try:
+        fd = os.open(get_config_path(), os.O_RDONLY | os.O_CLOEXEC)
+    except FileNotFoundError:
+        return None
+    try:
+        path = os.read(fd, _CONFIG_MAX_SIZE).decode('utf-8').strip()
+    except IsADirectoryError:
+        return None
+    finally:
+        os.close(fd)
+    if path:
+        os.environ[ROOT_ENV_VAR] = path
+        return path
     return None
 
 def update_templates_root(path):
     """Writes the templates root directory to the config file."""
-    config_path = get_config_path()
-    with open(config_path, 'w') as f:
-        f.write(path.strip() + '\n')
+    fd = os.open(get_config_path(), os.O_WRONLY | os.O_CREAT | os.O_TRUNC | os.O_CLOEXEC, 0o644)
+    try:
+        os.write(fd, (path.strip() + '\n').encode('utf-8'))
+    finally:
+        os.close(fd)
+    os.environ[ROOT_ENV_VAR] = path.strip()
+    get_templates_root.cache_clear()
 
 def prompt_for_templates_root():
-    # Use pick-root.swift to select a directory
-    script_path = os.path.join(os.path.dirname(__file__), 'pick-root.swift')
+    # Use pick-root to select a directory
+    script_path = pickers.resolve_picker('pick-root')
     default_dir = get_templates_root()
     if not default_dir:
-        default_dir = os.path.expanduser('~/Documents')
+        default_dir = _DEFAULT_ROOT
     result = subprocess.run([script_path, default_dir], capture_output=True, text=True)
     if result.returncode == 0:
         selected_dir = result.stdout.strip()
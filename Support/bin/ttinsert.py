@@ -2,95 +2,64 @@
 """
 MailMate TextTemplate Insertion Script
 
-This script allows users to insert the contents of a selected template file into a target file at a specified line. The template root directory is persistently stored in ~/.texttemplate_config and can be changed by the user. If not set, the user is prompted to select a directory using a GUI dialog.
+This script allows users to insert the contents of a selected template file into a target file at a specified line. It is run for every insertion, so it is kept small: it hands the insertion to ttinsertd.py if that is running, and only imports insertion.py, which does the actual work, if it isn't.
 """
+import json
 import os
-import subprocess
-import templates_root
+import socket
+import sys
 
-def insert_text_at_line(filepath, line_number, text):
+# ttinsertd.py, if it is running, listens on this socket (see install-daemon.sh)
+DAEMON_SOCKET = os.environ.get('TT_DAEMON_SOCKET') or os.path.join(os.environ.get('TMPDIR') or '/tmp', 'ttinsertd.sock')
+
+def parse_env(env):
     """
-    Insert the given text at the specified line number in the file.
+    Get the insertion point from the environment MailMate set for the command.
     Args:
-        filepath (str): Path to the file to modify.
-        line_number (int or str): Line number (1-based) to insert at.
-        text (str): Text to insert.
+        env (dict): Environment MailMate set for the command.
+    Returns:
+        tuple: Line number (int, 1-based) and path of the file being edited (str).
+    Raises:
+        ValueError: If MM_LINE_NUMBER or MM_EDIT_FILEPATH is missing or invalid.
     """
-    with open(filepath, 'r') as f:
-        lines = f.readlines()
-    idx = max(0, int(line_number) - 1)
-    lines.insert(idx, text)
-    with open(filepath, 'w') as f:
-        f.writelines(lines)
+    line_number = env.get('MM_LINE_NUMBER')
+    filepath = env.get('MM_EDIT_FILEPATH')
+    if not line_number or not filepath:
+        raise ValueError("MM_LINE_NUMBER and MM_EDIT_FILEPATH must be set in the environment.")
+    return int(line_number), filepath
 
-def get_template(template_root):
+def send_to_daemon(env):
     """
-    Prompts the user to select a template file from the template root directory.
-    Returns the contents of the selected file, or None if cancelled.
+    Hand the insertion to ttinsertd.py, which saves starting up and importing
+    everything again for each insertion.
     Args:
-        template_root (str): Directory to search for templates.
+        env (dict): Environment MailMate set for the command.
     Returns:
-        str or None: Contents of the selected template file, or None.
+        int or None: Exit status from the daemon, or None if it isn't running.
     """
-    picker_prog = "pick-template-browser"
-    # picker_prog = "pick-template-panel"
-    compiled_path = os.path.join(os.path.dirname(__file__), picker_prog)
-    script_path = compiled_path if os.path.isfile(compiled_path) and os.access(compiled_path, os.X_OK) else os.path.join(os.path.dirname(__file__), picker_prog + '.swift')
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
     try:
-        result = subprocess.run([script_path, template_root], capture_output=True, text=True)
-        if result.returncode == 0:
-            selected_file = result.stdout.strip()
-            if os.path.isfile(selected_file):
-                with open(selected_file, 'r') as tf:
-                    return tf.read()
-        else:
-            # User cancelled or error occurred; do nothing
-            pass
-    except Exception as e:
-        pass    
-    return None
-
-def replace_tags(text):
-    """Replace QuickText-style tags"""
-    # Currently we only support [[TO=firstname]] and [[TO=fullname]]
-    text = text.replace('[[TO=firstname]]', os.environ.get('MM_TO_NAME_FIRST', ''))
-    text = text.replace('[[TO=fullname]]', os.environ.get('MM_TO_NAME', ''))
-    return text
-
-def in_composer():
-    """
-    Check if the script is running in a MailMate composer window.
-    """
-    # We don't have a great way of checking at the moment, but we will...
-    return not os.environ.get('MM_HEADER_RECEIVED')
+        sock.connect(DAEMON_SOCKET)
+    except OSError:
+        sock.close()
+        return None
+    request = {k: v for k, v in env.items() if k.startswith('MM_')}
+    with sock, sock.makefile('rwb') as f:
+        f.write(json.dumps(request).encode('utf-8') + b'\n')
+        f.flush()
+        reply = f.readline()
+    try:
+        return int(reply)
+    except ValueError:
+        # The daemon went away part way through; don't risk inserting twice
+        return 1
 
 if __name__ == "__main__":
-    line_number = os.environ.get('MM_LINE_NUMBER')
-    filepath = os.environ.get('MM_EDIT_FILEPATH')
-    # import sys
-    # with open(os.path.join(os.getcwd(), "ttinsert.log"), "a") as log_file:
-    #     log_file.write("Header received " + str(os.environ.get('MM_HEADER_RECEIVED')) + "\n")
-
-    if not line_number or not filepath:
-        raise ValueError("MM_LINE_NUMBER and MM_EDIT_FILEPATH must be set in the environment.")
-
-
-    if not in_composer():
-        subprocess.run(["osascript", "-e", 'display dialog "TextTemplate can only be run from a composer window." with title "TextTemplate Error" buttons {"OK"} default button "OK" '])
-        exit(1)
-
-    templates_root = templates_root.get_templates_root()
-    if not templates_root:
-        templates_root = templates_root.prompt_for_templates_root()
-    if templates_root:
-        template_contents = get_template(templates_root)
-        if template_contents is not None:
-            insert_text_at_line(filepath, line_number, replace_tags(template_contents))
-            # mm_env = {k: v for k, v in os.environ.items() if k.startswith('MM_')}
-            # env_output = '\n'.join(f'{k}={v}' for k, v in mm_env.items())
-            # insert_text_at_line(filepath, line_number, env_output)
-    else:
-        # Give user an error message, in a GUI
-        subprocess.run(["osascript", "-e", 'display dialog "Can not get a template root directory." with title "TextTemplate Error" buttons {"OK"} default button "OK" '])
-
-
+    # Fail fast on a bad environment, before contacting the daemon
+    line_number, filepath = parse_env(os.environ)
+    status = send_to_daemon(os.environ)
+    if status is None:
+        # No daemon, so do the work here
+        import insertion
+        status = insertion.main(line_number, filepath)
+    sys.exit(status)
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+MailMate TextTemplate Insertion Daemon
+
+This script stays running in the background (installed as a launchd agent by install-daemon.sh) and performs template insertions on behalf of ttinsert.py, so that each insertion doesn't pay for starting Python and importing everything again. Each request is one line of JSON holding the MM_* environment MailMate set for the command; the reply is one line holding the command's exit status.
+"""
+import argparse
+import json
+import os
+import socketserver
+import sys
+import insertion
+import templates_root
+import ttinsert
+
+class InsertionHandler(socketserver.StreamRequestHandler):
+    """Handles a single insertion request from ttinsert.py."""
+
+    def handle(self):
+        status = 1
+        try:
+            env = json.loads(self.rfile.readline())
+            line_number, filepath = ttinsert.parse_env(env)
+            refresh_templates_root()
+            status = insertion.main(line_number, filepath, env)
+        except Exception as e:
+            print('ttinsertd: %s' % e, file=sys.stderr)
+        self.wfile.write(b'%d\n' % status)
+
+_config_mtime = None
+
+def refresh_templates_root():
+    """
+    Forget the cached templates root if the config file has changed since it
+    was read, e.g. because the user ran "Change template directory".
+    """
+    global _config_mtime
+    try:
+        mtime = os.stat(templates_root.get_config_path()).st_mtime_ns
+    except FileNotFoundError:
+        mtime = None
+    if mtime != _config_mtime:
+        _config_mtime = mtime
+        os.environ.pop(templates_root.ROOT_ENV_VAR, None)
+        templates_root.get_templates_root.cache_clear()
+
+def serve(socket_path):
+    """
+    Serve insertion requests on the given socket until killed. Requests are
+    handled one at a time, as each one may show the template picker.
+    Args:
+        socket_path (str): Path of the Unix domain socket to listen on.
+    """
+    try:
+        os.unlink(socket_path)  # remove a stale socket left by a previous daemon
+    except FileNotFoundError:
+        pass
+    with socketserver.UnixStreamServer(socket_path, InsertionHandler) as server:
+        server.serve_forever()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--socket', default=ttinsert.DAEMON_SOCKET, help='socket to listen on (default: %(default)s)')
+    serve(parser.parse_args().socket)